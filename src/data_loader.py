@@ -1,57 +1,167 @@
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Tuple
 
 
+_GUT_START_RE = re.compile(
+    r"\*\*\* *START OF (?:THIS|THE) PROJECT GUTENBERG EBOOK[^*]*\*\*\*",
+    re.IGNORECASE | re.ASCII
+)
+_GUT_END_RE = re.compile(
+    r"\*\*\* *END OF (?:THIS|THE) PROJECT GUTENBERG EBOOK[^*]*\*\*\*",
+    re.IGNORECASE | re.ASCII
+)
+# marker patterns are ASCII-only (\s, case folding) so Hyperscan on UTF-8 bytes matches exactly the same
+_ALT_START_RE = re.compile(r"(?:^|\n)(?:CHAPTER|I\.)\s", re.IGNORECASE | re.ASCII)
+# loose end marker must start within this many chars of the end of the text
+_ALT_END_WINDOW = 92
+# a trimmed sentence: up to and including the next [.!?], or the trimmed remainder of the text
+_SENTENCE_RE = re.compile(r"(?:[^.!?\s][^.!?]*)?[.!?]|[^.!?\s](?:[^.!?]*[^.!?\s])?")
+_WHITESPACE_RE = re.compile(r"\s")
 
-def fetch_raw_text(
+try:
+    import hyperscan
+except ImportError:  # optional; strip_gutenberg_header_footer falls back to the re patterns
+    hyperscan = None
+
+# All marker patterns compiled once into a single Hyperscan database, scanned in one pass
+_HS_START, _HS_END, _HS_ALT_START = 1, 2, 3
+_HS_DB = None
+if hyperscan is not None:
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=[p.pattern.encode() for p in (_GUT_START_RE, _GUT_END_RE, _ALT_START_RE)],
+        ids=[_HS_START, _HS_END, _HS_ALT_START],
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * 3
+    )
+# a scratch space serves one scan at a time, so each thread (e.g. fetch_and_clean_many workers) gets its own
+_HS_LOCAL = threading.local()
+
+# Shared session so repeated fetches from the same host reuse pooled connections
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "cti-demo/1.0"})
+_ADAPTER = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+
+def fetch_raw_text_with_etag(
     url: str,
+    etag: Optional[str] = None,
     timeout: int = 30,
     user_agent: str = "cti-demo/1.0"
-) -> Optional[str]:
+) -> Tuple[Optional[str], Optional[str]]:
     """
-    Fetch URL and return decoded text. Returns None on failure.
+    Fetch URL and return (decoded text, ETag of the response).
+    If the caller passes the ETag of a copy it already holds, If-None-Match is sent and
+    (None, etag) is returned on 304 Not Modified. Returns (None, None) on failure.
     """
     headers = {"User-Agent": user_agent}
+    if etag:
+        headers["If-None-Match"] = etag
     try:
-        r = requests.get(url, timeout=timeout, headers=headers)
-        r.raise_for_status()
-        return r.text
+        with _SESSION.get(url, timeout=timeout, headers=headers, stream=True) as r:
+            if etag and r.status_code == 304:
+                return None, etag
+            r.raise_for_status()
+            # decode once with the declared charset; r.text would run charset detection over the whole body
+            body = r.content
+            try:
+                text = body.decode(r.encoding or "utf-8", errors="replace")
+            except LookupError:  # unknown charset label in Content-Type
+                text = body.decode("utf-8", errors="replace")
+            return text, r.headers.get("ETag")
     except requests.RequestException as e:
         print(f"HTTP error fetching {url}: {e}")
-        return None
+        return None, None
+
+
+def fetch_raw_text(
+    url: str,
+    timeout: int = 30,
+    user_agent: str = "cti-demo/1.0"
+) -> Optional[str]:
+    """
+    Fetch URL and return decoded text. Returns None on failure.
+    """
+    text, _ = fetch_raw_text_with_etag(url, timeout=timeout, user_agent=user_agent)
+    return text
+
+
+def _char_offset(text: str, data: bytes, offset: int) -> int:
+    # byte offset in text's UTF-8 encoding -> str offset, decoding the shorter side only
+    if len(data) == len(text):
+        return offset
+    if offset <= len(data) // 2:
+        return len(data[:offset].decode("utf-8"))
+    return len(text) - len(data[offset:].decode("utf-8"))
+
+
+def _scan_markers(text: str) -> Dict[int, Tuple[int, int]]:
+    """
+    Run the Hyperscan database over the text's UTF-8 bytes once.
+    Returns the leftmost (start, end) str offsets found for each pattern id.
+    """
+    data = text.encode("utf-8")
+    leftmost: Dict[int, Tuple[int, int]] = {}
+
+    def on_match(pattern_id, start, end, flags, context):
+        best = leftmost.get(pattern_id)
+        if best is None or (start, end) < best:
+            leftmost[pattern_id] = (start, end)
+
+    scratch = getattr(_HS_LOCAL, "scratch", None)
+    if scratch is None:
+        scratch = _HS_LOCAL.scratch = hyperscan.Scratch(_HS_DB)
+    _HS_DB.scan(data, match_event_handler=on_match, scratch=scratch)
+    # every marker starts and ends on an ASCII character, so byte offsets fall on character boundaries
+    return {
+        pattern_id: (_char_offset(text, data, start), _char_offset(text, data, end))
+        for pattern_id, (start, end) in leftmost.items()
+    }
 
 
 def strip_gutenberg_header_footer(text: str) -> str:
     """
     Remove Project Gutenberg header/footer using robust heuristics.
+    Uses a single Hyperscan pass when the hyperscan package is installed.
     """
     if not isinstance(text, str):
         raise TypeError("strip_gutenberg_header_footer expects a str")
 
-    # Standard Gutenberg markers
-    start_re = re.compile(
-        r"\*\*\* *START OF (THIS|THE) PROJECT GUTENBERG EBOOK.*?\*\*\*",
-        re.IGNORECASE | re.DOTALL
-    )
-    end_re = re.compile(
-        r"\*\*\* *END OF (THIS|THE) PROJECT GUTENBERG EBOOK.*?\*\*\*",
-        re.IGNORECASE | re.DOTALL
-    )
+    if _HS_DB is not None:
+        markers = _scan_markers(text)
+        start_idx = (
+            markers[_HS_START][1] if _HS_START in markers
+            else markers[_HS_ALT_START][0] if _HS_ALT_START in markers
+            else 0
+        )
+        end_idx = markers[_HS_END][0] if _HS_END in markers else None
+    else:
+        # Standard Gutenberg markers
+        start_match = _GUT_START_RE.search(text)
+        if start_match:
+            start_idx = start_match.end()
+        else:
+            alt_start = _ALT_START_RE.search(text)
+            start_idx = alt_start.start() if alt_start else 0
 
-    start_match = start_re.search(text)
-    start_idx = start_match.end() if start_match else (
-        re.search(r"(?:^|\n)(chapter|i\.)\s+[A-Z0-9\.\- ]{2,}", text, re.IGNORECASE).start()
-        if re.search(r"(?:^|\n)(chapter|i\.)\s+[A-Z0-9\.\- ]{2,}", text, re.IGNORECASE) else 0
-    )
+        end_match = _GUT_END_RE.search(text)
+        end_idx = end_match.start() if end_match else None
 
-    end_match = end_re.search(text)
-    end_idx = end_match.start() if end_match else (
-        re.search(r"\*\*\* *END OF .{0,80}$", text, re.IGNORECASE | re.DOTALL).start()
-        if re.search(r"\*\*\* *END OF .{0,80}$", text, re.IGNORECASE | re.DOTALL) else len(text)
-    )
+    if end_idx is None:
+        alt_end = text.rfind("*** END OF", max(0, len(text) - _ALT_END_WINDOW))
+        end_idx = alt_end if alt_end != -1 else len(text)
 
     return text[start_idx:end_idx].strip()
 
@@ -87,6 +197,73 @@ def fetch_and_clean(url: str, save_path: Optional[str] = None) -> Optional[str]:
 
     return cleaned_text
 
+
+def fetch_and_clean_many(
+    urls: List[str],
+    save_paths: Optional[Dict[str, str]] = None,
+    max_workers: int = 8
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Fetch and clean several URLs concurrently, sharing the pooled HTTP session.
+
+    Args:
+        urls (List[str]): URLs to fetch text from.
+        save_paths (Dict[str, str], optional): Maps a URL to the path its cleaned text is saved to.
+            A failed save is reported and does not stop the iteration; the text is still yielded.
+        max_workers (int): Number of worker threads.
+
+    Yields:
+        Tuple[str, Optional[str]]: (url, cleaned text or None if fetch failed), in completion order.
+        Stopping early cancels fetches that have not started yet instead of waiting for them.
+    """
+    save_paths = save_paths or {}
+
+    def fetch_clean_save(url: str) -> Optional[str]:
+        cleaned_text = fetch_and_clean(url)
+        save_path = save_paths.get(url)
+        if cleaned_text is not None and save_path:
+            try:
+                save_text_to_file(cleaned_text, save_path)
+            except OSError as e:
+                print(f"Error saving {url} to {save_path}: {e}")
+        return cleaned_text
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(fetch_clean_save, url): url for url in urls}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _sentence_chunk_spans(text: str, max_chars: int) -> List[Tuple[int, int]]:
+    """
+    Greedily pack whitespace-trimmed sentences into (start, end) offsets of at most max_chars.
+    Sentences longer than max_chars are cut into max_chars slices of their own.
+    """
+    spans: List[Tuple[int, int]] = []
+    lo = hi = -1
+    # the regex engine does the character scanning; this loop only does offset arithmetic
+    for m in _SENTENCE_RE.finditer(text):
+        s_lo, s_hi = m.span()
+        if lo != -1 and s_hi - lo <= max_chars:
+            hi = s_hi
+            continue
+        if lo != -1:
+            spans.append((lo, hi))
+        # if single sentence is longer than max_chars, we still include it alone
+        if s_hi - s_lo > max_chars:
+            spans.extend((i, min(i + max_chars, s_hi)) for i in range(s_lo, s_hi, max_chars))
+            lo = -1
+        else:
+            lo, hi = s_lo, s_hi
+    if lo != -1:
+        spans.append((lo, hi))
+
+    return spans
+
+
 def chunk_text(text: str, max_chars: int = 3000, overlap: int = 200) -> dict:
     """
     Chunk text into pieces no larger than max_chars (approx), with optional overlap.
@@ -95,9 +272,6 @@ def chunk_text(text: str, max_chars: int = 3000, overlap: int = 200) -> dict:
     Overlap is now applied with full words (no cutting words in half).
     Returns a dictionary with chunk IDs as keys.
     """
-    import re
-    from typing import List, Dict
-
     if not isinstance(text, str):
         raise TypeError("chunk_text expects a str")
     if max_chars <= 0:
@@ -105,30 +279,8 @@ def chunk_text(text: str, max_chars: int = 3000, overlap: int = 200) -> dict:
     if overlap < 0:
         raise ValueError("overlap must be >= 0")
 
-    # split by sentence boundary  
-    sentences = re.split(r'(?<=[.!?])', text)
-    chunks: List[str] = []
-    cur = ""
-
-    for s in sentences:
-        s = s.strip()
-        if not s:
-            continue
-        if len(cur) + len(s) + 1 <= max_chars:
-            cur = (cur + " " + s).strip()
-        else:
-            if cur:
-                chunks.append(cur)
-            # if single sentence is longer than max_chars, we still include it alone
-            if len(s) > max_chars:
-                for i in range(0, len(s), max_chars):
-                    part = s[i:i + max_chars]
-                    chunks.append(part)
-                cur = ""
-            else:
-                cur = s
-    if cur:
-        chunks.append(cur)
+    # pack sentences by offset and slice each chunk out of the text once
+    chunks: List[str] = [text[lo:hi] for lo, hi in _sentence_chunk_spans(text, max_chars)]
 
     # apply overlap using **whole words**
     if overlap and len(chunks) > 1:
@@ -139,18 +291,12 @@ def chunk_text(text: str, max_chars: int = 3000, overlap: int = 200) -> dict:
                 continue
             prev = new_chunks[-1]
 
-            # split previous chunk into words
-            prev_words = prev.split()
-            # take enough words from the end to get at most `overlap` characters
-            overlap_words = []
-            char_count = 0
-            for w in reversed(prev_words):
-                if char_count + len(w) + 1 > overlap:
-                    break
-                overlap_words.insert(0, w)  # prepend to maintain order
-                char_count += len(w) + 1  # +1 for space
-
-            overlap_text = " ".join(overlap_words)
+            # take the tail of the previous chunk, snapped forward to the next word boundary
+            if len(prev) < overlap:
+                overlap_text = prev
+            else:
+                snap = _WHITESPACE_RE.search(prev, len(prev) - overlap)
+                overlap_text = prev[snap.end():] if snap else ""
             candidate = (overlap_text + " " + c).strip()
             new_chunks.append(candidate)
         chunks = new_chunks
@@ -159,4 +305,3 @@ def chunk_text(text: str, max_chars: int = 3000, overlap: int = 200) -> dict:
     chunk_dict: Dict[str, str] = {f"chunk_{i+1}": c for i, c in enumerate(chunks)}
 
     return chunk_dict
-
@@ -1,100 +1,198 @@
 from typing import List, Dict, Tuple
+from functools import lru_cache
+import logging
+import sys
+import numpy as np
 from difflib import SequenceMatcher
-from copy import deepcopy
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
+try:
+    from rapidfuzz import fuzz, process
+
+    def name_similarity(a: str, b: str) -> float:
+        return fuzz.ratio(a, b) / 100
+except ImportError:  # pure-Python fallback, same 0-1 scale
+    process = None
+
+    def name_similarity(a: str, b: str) -> float:
+        return SequenceMatcher(None, a, b).ratio()
+
+logger = logging.getLogger(__name__)
+
+_PREFIXES = frozenset(("dr", "mr", "mrs", "ms", "prof", "sir"))
+
+@lru_cache(maxsize=100_000)
 def normalize_name(name: str) -> str:
-    prefixes = ["dr", "mr", "mrs", "ms", "prof", "sir"]
-    name = name.lower().strip()
-    parts = name.split()
-    if parts and parts[0].rstrip(".") in prefixes:
+    parts = name.lower().strip().split()
+    if parts and parts[0].rstrip(".") in _PREFIXES:
         parts = parts[1:]
     return " ".join(parts)
 
+def intern_key(value):
+    # canonical ids/names are interned so resolved_map values share cached string hashes; non-str ids pass through
+    return sys.intern(value) if type(value) is str else value
+
+def _block_keys(name_norm: str) -> set:
+    # bucket on the first and last token so "j. stangerson" still meets "stangerson"
+    parts = name_norm.split()
+    if not parts:
+        return {""}
+    return {parts[0][:2], parts[-1][:2]}
+
+def similarity_edges(norms: List[str], sim_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    # only names sharing a block key are scored against each other
+    buckets: Dict[str, List[int]] = {}
+    for i, name_norm in enumerate(norms):
+        for key in _block_keys(name_norm):
+            buckets.setdefault(key, []).append(i)
+
+    cutoff = sim_threshold * 100  # rapidfuzz scorers work on a 0-100 scale
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        names = [norms[i] for i in members]
+        # pairwise similarities for the bucket in one C-level call, edges from the upper triangle
+        if process is not None:
+            scores = process.cdist(names, names, scorer=fuzz.ratio, score_cutoff=cutoff, workers=-1)
+            linked = scores >= cutoff
+        else:
+            linked = np.array([[name_similarity(a, b) for b in names] for a in names]) >= sim_threshold
+        r, c = np.nonzero(np.triu(linked, k=1))
+        members_arr = np.asarray(members)
+        rows.append(members_arr[r])
+        cols.append(members_arr[c])
+
+    if not rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(rows), np.concatenate(cols)
+
+def component_canonicals(norms: List[str], rows: np.ndarray, cols: np.ndarray) -> List[int]:
+    # connected components over the similarity edges; each entity maps to its component's
+    # canonical, the shortest normalized name with the earliest entity winning ties
+    n = len(norms)
+    graph = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+
+    order = np.lexsort((np.arange(n), np.fromiter(map(len, norms), dtype=np.intp, count=n)))
+    comp_ids, first = np.unique(labels[order], return_index=True)
+    canonical_of_comp = np.empty(len(comp_ids), dtype=np.intp)
+    canonical_of_comp[comp_ids] = order[first]
+    return canonical_of_comp[labels].tolist()
+
 def merge_entities(
     entities: List[Dict], sim_threshold: float = 0.8, log_merges: bool = True
 ) -> Tuple[List[Dict], Dict[str, str]]:
     resolved_map: Dict[str, str] = {}
     canonical_entities: List[Dict] = []
-
-    for ent in entities:
-        ent_name_norm = normalize_name(ent["name"])
-        matched = None
-        sim = 0.0
-
-        for canon in canonical_entities:
-            canon_name_norm = normalize_name(canon["name"])
-            canon_aliases_norm = [normalize_name(a) for a in canon.get("aliases", [])]
-
-            if ent_name_norm == canon_name_norm or ent_name_norm in canon_aliases_norm:
-                matched = canon
-                sim = 1.0
-                break
-
-            sim = SequenceMatcher(None, ent_name_norm, canon_name_norm).ratio()
-            if sim >= sim_threshold:
-                matched = canon
-                break
-
-        if matched:
-            # Ensure aliases exist
-            if "aliases" not in matched:
-                matched["aliases"] = []
-
-            # Preserve aliases
-            if ent["name"] != matched["name"] and ent["name"] not in matched["aliases"]:
-                matched["aliases"].append(ent["name"])
-
-            # Merge any other attributes (non-destructive)
-            for k, v in ent.items():
-                if k not in matched:
-                    matched[k] = v
-                elif isinstance(matched[k], list) and isinstance(v, list):
-                    matched[k] = list({*matched[k], *v})  # union of lists
-
-            resolved_map[ent["id"]] = matched["id"]
-            if log_merges:
-                print(f"[Entity Resolution] Merged '{ent['name']}' -> '{matched['name']}' (sim={sim:.2f})")
-        else:
-            # Keep full entity dict as new canonical
-            new_canon = deepcopy(ent)
-            if "aliases" not in new_canon:
-                new_canon["aliases"] = []
-            canonical_entities.append(new_canon)
-            resolved_map[ent["id"]] = new_canon["id"]
+    if not entities:
+        return canonical_entities, resolved_map
+
+    norms = [normalize_name(ent["name"]) for ent in entities]
+    rows, cols = similarity_edges(norms, sim_threshold)
+
+    # exact matches against aliases declared by an earlier entity
+    alias_rows: List[int] = []
+    alias_cols: List[int] = []
+    alias_owner: Dict[str, int] = {}
+    for i, ent in enumerate(entities):
+        owner = alias_owner.get(norms[i])
+        if owner is not None:
+            alias_rows.append(owner)
+            alias_cols.append(i)
+        for a in ent.get("aliases", []):
+            alias_owner.setdefault(normalize_name(a), i)
+    if alias_rows:
+        rows = np.concatenate((rows, np.asarray(alias_rows, dtype=np.intp)))
+        cols = np.concatenate((cols, np.asarray(alias_cols, dtype=np.intp)))
+
+    canonical_of = component_canonicals(norms, rows, cols)
+
+    canonical_by_root: Dict[int, Dict] = {}
+    # ordered sets backing each canonical's list fields, written back once at the end
+    list_sets: Dict[int, Dict[str, Dict]] = {}
+    for i, ent in enumerate(entities):
+        root = canonical_of[i]
+        matched = canonical_by_root.get(root)
+
+        if matched is None:
+            # Keep canonical entity as-is; list fields are copied so the output never shares lists with the input
+            canon_ent = entities[root]
+            matched = {
+                **{k: list(v) if isinstance(v, list) else v for k, v in canon_ent.items()},
+                "id": intern_key(canon_ent["id"]),
+                "name": intern_key(canon_ent["name"]),
+                "aliases": list(canon_ent.get("aliases", [])),
+            }
+            canonical_entities.append(matched)
+            canonical_by_root[root] = matched
+            list_sets[root] = {"aliases": dict.fromkeys(matched["aliases"])}
+
+        resolved_map[ent["id"]] = matched["id"]
+        if i == root:
+            continue
+
+        sets = list_sets[root]
+
+        # Preserve aliases
+        if ent["name"] != matched["name"]:
+            sets["aliases"][ent["name"]] = None
+
+        # Merge any other attributes (non-destructive)
+        for k, v in ent.items():
+            if k not in matched:
+                matched[k] = list(v) if isinstance(v, list) else v
+            elif isinstance(matched[k], list) and isinstance(v, list):
+                if k not in sets:
+                    sets[k] = dict.fromkeys(matched[k])
+                sets[k].update(dict.fromkeys(v))  # union of lists
+
+        if log_merges and logger.isEnabledFor(logging.DEBUG):
+            sim = name_similarity(norms[i], norms[root])
+            logger.debug("[Entity Resolution] Merged '%s' -> '%s' (sim=%.2f)", ent["name"], matched["name"], sim)
+
+    for root, sets in list_sets.items():
+        canon = canonical_by_root[root]
+        sets["aliases"].pop(canon["name"], None)
+        for k, items in sets.items():
+            canon[k] = list(items)
 
     return canonical_entities, resolved_map
 
 def remap_relationships(
     relationships: List[Dict], resolved_map: Dict[str, str], log: bool = False
 ) -> List[Dict]:
-    resolved_relationships: List[Dict] = []
+    # pre-sized and truncated afterwards instead of growing by append
+    resolved_relationships: List[Dict] = [None] * len(relationships)
+    n_kept = 0
     seen: set = set()
+    seen_add = seen.add
     for rel in relationships:
         src = resolved_map.get(rel["source"], rel["source"])
         tgt = resolved_map.get(rel["target"], rel["target"])
         rel_key = (src, rel["relation"], tgt)
 
         if rel_key not in seen:
-            new_rel = deepcopy(rel)
-            new_rel["source"] = src
-            new_rel["target"] = tgt
-            resolved_relationships.append(new_rel)
-            seen.add(rel_key)
+            # flat dicts; only source/target change, so a shallow copy is enough
+            resolved_relationships[n_kept] = {**rel, "source": src, "target": tgt}
+            n_kept += 1
+            seen_add(rel_key)
         elif log:
-            print(f"[Relationship Resolution] Duplicate removed: {rel_key}")
+            logger.debug("[Relationship Resolution] Duplicate removed: %s", rel_key)
+    del resolved_relationships[n_kept:]
     return resolved_relationships
 
 def finalize_entities_and_relationships(
     entities: List[Dict], relationships: List[Dict], log: bool = True
 ) -> Tuple[List[Dict], List[Dict]]:
-    entities_copy = deepcopy(entities)
-    relationships_copy = deepcopy(relationships)
-
-    canonical_entities, resolved_map = merge_entities(entities_copy, log_merges=log)
+    # merge_entities and remap_relationships build new dicts, so the inputs are never mutated
+    canonical_entities, resolved_map = merge_entities(entities, log_merges=log)
 
     valid_ids = {e["id"] for e in canonical_entities}
     filtered_relationships = [
-        rel for rel in relationships_copy
+        rel for rel in relationships
         if rel["source"] in resolved_map and rel["target"] in resolved_map
            and resolved_map[rel["source"]] in valid_ids
            and resolved_map[rel["target"]] in valid_ids
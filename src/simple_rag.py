@@ -1,45 +1,99 @@
 from sentence_transformers import SentenceTransformer
 import faiss
+import torch
 import numpy as np
+import msgspec
 import pickle
 import os
+import math
 
 # ----- 1. Create embeddings -----
-def create_embeddings(documents, model_name='all-MiniLM-L6-v2'):
+def create_embeddings(documents, model_name='all-MiniLM-L6-v2', batch_size=128):
     """
     documents: list of strings
-    returns: numpy array of embeddings, and the model
+    batch_size: number of documents encoded per forward pass
+    returns: numpy array of L2-normalized embeddings, and the model
     """
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(documents, show_progress_bar=True)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(model_name, device=device)
+    if device == "cuda":
+        model.half()  # FP16 weights on GPU
+    embeddings = model.encode(
+        documents,
+        batch_size=batch_size,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
     return embeddings, model
 
 
 # ----- 2. Create FAISS database -----
-def create_faiss_index(embeddings):
+def create_faiss_index(embeddings, hnsw_m=32, ivf_threshold=500_000, pq_m=None):
     """
     embeddings: numpy array of shape (n_docs, dim)
-    returns: FAISS index
+    hnsw_m: neighbours per node in the HNSW graph
+    ivf_threshold: corpus size from which an IVF-PQ index is built instead of HNSW
+    pq_m: PQ sub-quantizers for IVF-PQ; must divide dim (default: largest divisor of dim up to 64)
+          nlist grows with the corpus as ~4*sqrt(n_docs)
+    returns: FAISS inner-product index over L2-normalized vectors (cosine similarity)
     """
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(np.array(embeddings, dtype="float32"))
+    vectors = np.array(embeddings, dtype="float32")
+    faiss.normalize_L2(vectors)
+    n_docs, dimension = vectors.shape
+
+    if n_docs >= ivf_threshold:
+        if pq_m is None:
+            pq_m = max(m for m in range(1, min(dimension, 64) + 1) if dimension % m == 0)
+        if pq_m <= 0 or dimension % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must be a positive divisor of the embedding dimension {dimension}")
+        # keep ~39 training points per centroid, as FAISS recommends
+        nlist = max(1, min(int(4 * math.sqrt(n_docs)), n_docs // 39))
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+    else:
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+    index.add(vectors)
     return index
 
 
 # ----- 3. Retrieve relevant chunks -----
+def retrieve_chunks_batch(queries, index, documents, model, top_k=3, batch_size=64):
+    """
+    queries: list of strings, encoded together as one (n_queries, dim) batch
+    index: FAISS index
+    documents: list of strings
+    model: SentenceTransformer model used for embeddings
+    top_k: number of similar chunks to retrieve per query
+    batch_size: number of queries encoded per forward pass
+    returns: list with the top-k chunk texts for each query
+    """
+    q_embed = model.encode(
+        queries, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+    )
+    q_embed = np.array(q_embed, dtype="float32")
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = max(top_k * 4, 32)
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = max(top_k * 4, 32)
+    D, I = index.search(q_embed, top_k)
+    return [[documents[i] for i in row if i != -1] for row in I]
+
+
 def retrieve_chunks(query, index, documents, model, top_k=3):
     """
-    query: string
+    query: string (or list of strings, see retrieve_chunks_batch)
     index: FAISS index
     documents: list of strings
     model: SentenceTransformer model used for embeddings
     top_k: number of similar chunks to retrieve
-    returns: list of top-k chunk texts
+    returns: list of top-k chunk texts (a list of such lists for a list of queries)
     """
-    q_embed = model.encode([query])  # batch format
-    D, I = index.search(np.array(q_embed, dtype="float32"), top_k)
-    return [documents[i] for i in I[0]]
+    if isinstance(query, str):
+        return retrieve_chunks_batch([query], index, documents, model, top_k=top_k)[0]
+    return retrieve_chunks_batch(query, index, documents, model, top_k=top_k)
 
 def save_artifacts(embeddings, index, documents, path="artifacts", prefix="mydata"):
     """
@@ -53,19 +107,29 @@ def save_artifacts(embeddings, index, documents, path="artifacts", prefix="mydat
     # Save FAISS index
     faiss.write_index(index, os.path.join(path, f"{prefix}_faiss.index"))
 
-    # Save documents (list of strings)
-    with open(os.path.join(path, f"{prefix}_documents.pkl"), "wb") as f:
-        pickle.dump(documents, f)
+    # Save documents (list of strings, or dict of chunk id -> text) as MessagePack
+    with open(os.path.join(path, f"{prefix}_documents.mpk"), "wb") as f:
+        f.write(msgspec.msgpack.encode(documents))
 
 def load_artifacts(path="artifacts", prefix="mydata"):
     """
     Load embeddings, FAISS index, and documents from disk.
+    Embeddings and index are memory-mapped read-only, so pages are read on first use.
     """
-    embeddings = np.load(os.path.join(path, f"{prefix}_embeddings.npy"))
+    embeddings = np.load(os.path.join(path, f"{prefix}_embeddings.npy"), mmap_mode="r")
 
-    index = faiss.read_index(os.path.join(path, f"{prefix}_faiss.index"))
+    index = faiss.read_index(
+        os.path.join(path, f"{prefix}_faiss.index"),
+        faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+    )
 
-    with open(os.path.join(path, f"{prefix}_documents.pkl"), "rb") as f:
-        documents = pickle.load(f)
+    documents_path = os.path.join(path, f"{prefix}_documents.mpk")
+    if os.path.exists(documents_path):
+        with open(documents_path, "rb") as f:
+            documents = msgspec.msgpack.decode(f.read())
+    else:
+        # artifacts saved before the switch to MessagePack
+        with open(os.path.join(path, f"{prefix}_documents.pkl"), "rb") as f:
+            documents = pickle.load(f)
 
     return embeddings, index, documents